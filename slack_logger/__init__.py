@@ -1,12 +1,18 @@
+import functools
 import json
 import logging
+import queue
+import re
+import ssl
+import threading
+import time
 from abc import ABC, abstractmethod
-from collections.abc import Sequence
+from collections.abc import Callable, Hashable, Iterable, Iterator, Mapping, Sequence
 from enum import Enum
 from logging import LogRecord
 from typing import Any
 
-from attrs import Factory, asdict, define, field, validators
+from attrs import Factory, define, field, validators
 from cattrs import Converter
 from slack_sdk.models.attachments import Attachment
 from slack_sdk.models.blocks import Block, ContextBlock, DividerBlock, HeaderBlock, SectionBlock
@@ -18,6 +24,14 @@ log = logging.getLogger("slack_logger")
 log.setLevel(logging.DEBUG)
 
 HTTPOk = 200
+# Upper bound of cached header blocks
+HeaderCacheSize = 256
+# Upper bound of cached message blocks per message design
+BlocksCacheSize = 1024
+# Slack rejects messages with more blocks than this
+SlackMaxBlocks = 50
+# Upper bound of cached filter decisions per slack filter
+DecisionCacheSize = 1024
 
 
 class SendError(Exception):
@@ -43,6 +57,32 @@ DEFAULT_EMOJIS = {
 }
 
 
+# Shared default for records without extra fields, it is only read and never modified
+_EMPTY_FIELDS: Mapping[str, str] = {}
+
+
+def typed_value(value: object) -> tuple[type, object]:
+    # Equal values of different types like 1, 1.0 and True share a hash, but are rendered differently
+    return (type(value), value)
+
+
+def typed_items(fields: Mapping[Any, object]) -> tuple[tuple[object, ...], ...]:
+    return tuple((type(key), key, type(value), value) for key, value in fields.items())
+
+
+# Blocks are only read when sending, so a single divider can be shared by all messages
+_DIVIDER = DividerBlock()
+
+# Headers only vary by icon, level and source, so the few distinct blocks are shared by all message designs
+_HEADER_CACHE: dict[tuple[str | None, str, str], HeaderBlock] = {}
+
+
+class OverflowPolicy(Enum):
+    Block = "Block"  # wait until the background worker made room
+    DropNewest = "DropNewest"  # discard the message that does not fit anymore
+    DropOldest = "DropOldest"  # discard the longest waiting message to make room
+
+
 class FilterType(Enum):
     AnyAllowList = "AnyAllowList"
     AllAllowList = "AllAllowList"
@@ -50,6 +90,15 @@ class FilterType(Enum):
     AllDenyList = "AllDenyList"
 
 
+# Combines the filter conditions of a SlackFilter depending on its FilterType
+FILTER_OPS: dict[FilterType, Callable[[Iterable[bool]], bool]] = {
+    FilterType.AnyAllowList: any,
+    FilterType.AllAllowList: all,
+    FilterType.AnyDenyList: lambda cond_list: not any(cond_list),
+    FilterType.AllDenyList: lambda cond_list: not all(cond_list),
+}
+
+
 @define
 class LogConfig:
     service: str | None = None
@@ -71,7 +120,7 @@ config_strict_context_converter.register_structure_hook_func(lambda t: t == list
 
 @define
 class FormatConfig(LogConfig):
-    emojis: dict[int, str] = DEFAULT_EMOJIS
+    emojis: dict[int, str] = Factory(lambda: dict(DEFAULT_EMOJIS))
 
 
 @define
@@ -82,12 +131,14 @@ class FilterConfig(LogConfig):
 
 @define
 class MessageDesign(ABC):
+    _blocks_cache: dict[Hashable, Sequence[Block]] = field(init=False, factory=dict, repr=False, eq=False)
+
     @abstractmethod
     def format_blocks(self, record: LogRecord) -> Sequence[Block | None]:
         pass
 
     def get_env(self, config: LogConfig, record: LogRecord) -> str | None:
-        dynamic_env: str | None = getattr(record, "environment", None)
+        dynamic_env: str | None = record.__dict__.get("environment")
         if dynamic_env is not None:
             return dynamic_env
         if config.environment is not None:
@@ -95,7 +146,7 @@ class MessageDesign(ABC):
         return None
 
     def get_service(self, config: LogConfig, record: LogRecord) -> str | None:
-        dynamic_service: str | None = getattr(record, "service", None)
+        dynamic_service: str | None = record.__dict__.get("service")
         if dynamic_service is not None:
             return dynamic_service
         if config.service is not None:
@@ -103,17 +154,20 @@ class MessageDesign(ABC):
         return None
 
     def construct_header(self, record: LogRecord, config: LogConfig, icon: str | None, level: str) -> HeaderBlock:
-        service: str | None = self.get_service(config=config, record=record)
-        header_msg: str
-        if icon is not None:
-            header_msg = f"{icon} "
-        header_msg += level
-        if config.service is not None:
-            header_msg += f" | {service}"
-        else:
-            header_msg += f" | {record.name}"
+        source: str = str(self.get_service(config=config, record=record)) if config.service is not None else record.name
+        key = (icon, level, source)
+        header = _HEADER_CACHE.get(key)
+        if header is not None:
+            return header
+
+        header_msg = f"{icon} " if icon is not None else ""
+        header_msg += f"{level} | {source}"
+        header = HeaderBlock(text=PlainTextObject(text=header_msg))
 
-        return HeaderBlock(text=PlainTextObject(text=header_msg))
+        if len(_HEADER_CACHE) >= HeaderCacheSize:
+            _HEADER_CACHE.clear()
+        _HEADER_CACHE[key] = header
+        return header
 
     def construct_context(self, config: LogConfig, env: str | None, service: str | None) -> ContextBlock | None:
         if config.context != []:
@@ -122,16 +176,46 @@ class MessageDesign(ABC):
 
         if env is not None and service is not None:
             return ContextBlock(elements=[MarkdownTextObject(text=f":point_right: {env}, {service}")])
-        if env is None:
+        if env is not None:
             return ContextBlock(elements=[MarkdownTextObject(text=f":point_right: {env}")])
-        if service is None:
+        if service is not None:
             return ContextBlock(elements=[MarkdownTextObject(text=f":point_right: {service}")])
 
         return None
 
-    def format(self, record: LogRecord) -> str:  # noqa: A003 (allow method name "format")
+    def get_message(self, record: LogRecord) -> str:
+        # build_blocks stores the message on the record like logging.Formatter.format, so it is only built once
+        message: str | None = record.__dict__.get("message")
+        return message if message is not None else record.getMessage()
+
+    def cache_key(self, record: LogRecord) -> Hashable | None:  # noqa: ARG002 (used by subclasses)
+        # Designs that know which record and config values they read can return a key of those to reuse their blocks.
+        # Returning None disables the cache.
+        return None
+
+    def build_blocks(self, record: LogRecord) -> Sequence[Block]:
+        record.message = record.getMessage()
+        key = self.cache_key(record=record)
+        if key is not None:
+            try:
+                cached = self._blocks_cache.get(key)
+            except TypeError:  # unhashable values passed via extra
+                key = None
+            else:
+                if cached is not None:
+                    return cached
+
         maybe_blocks: Sequence[Block | None] = self.format_blocks(record=record)
-        blocks: Sequence[Block] = [b for b in maybe_blocks if b is not None]
+        blocks: Sequence[Block] = tuple(b for b in maybe_blocks if b is not None)
+
+        if key is not None:
+            if len(self._blocks_cache) >= BlocksCacheSize:
+                self._blocks_cache.clear()
+            self._blocks_cache[key] = blocks
+        return blocks
+
+    def format(self, record: LogRecord) -> str:  # noqa: A003 (allow method name "format")
+        blocks: Sequence[Block] = self.build_blocks(record=record)
         str_blocks: str = json.dumps([block.to_dict() for block in blocks])
         log.debug("str_blocks: %s", str_blocks)
         return str_blocks
@@ -147,9 +231,20 @@ class NoDesign(MessageDesign):
 class MinimalDesign(MessageDesign):
     config: FormatConfig
 
+    def cache_key(self, record: LogRecord) -> Hashable | None:
+        return (
+            record.levelno,
+            record.levelname,
+            record.name,
+            typed_value(record.__dict__.get("service")),
+            self.get_message(record),
+            self.config.emojis.get(record.levelno),
+            typed_value(self.config.service),
+        )
+
     def format_blocks(self, record: LogRecord) -> Sequence[Block | None]:
         level = record.levelname
-        message = record.getMessage()
+        message = self.get_message(record)
         icon = self.config.emojis.get(record.levelno)
 
         header: HeaderBlock = self.construct_header(record=record, config=self.config, icon=icon, level=level)
@@ -166,10 +261,32 @@ class MinimalDesign(MessageDesign):
 @define
 class RichDesign(MessageDesign):
     config: FormatConfig
+    # Records without dynamic extra fields share the block of the configured ones, built again only if they change
+    _config_fields: tuple[tuple[tuple[object, ...], ...], SectionBlock] | None = field(
+        init=False, default=None, repr=False, eq=False
+    )
 
-    def format_blocks(self, record: LogRecord) -> Sequence[Block | None]:
+    def cache_key(self, record: LogRecord) -> Hashable | None:
+        if record.exc_info is not None:
+            return None  # tracebacks rarely repeat
+        return (
+            record.levelno,
+            record.levelname,
+            record.name,
+            typed_value(record.__dict__.get("service")),
+            typed_value(record.__dict__.get("environment")),
+            self.get_message(record),
+            typed_items(record.__dict__.get("extra_fields", _EMPTY_FIELDS)),
+            self.config.emojis.get(record.levelno),
+            typed_value(self.config.service),
+            typed_value(self.config.environment),
+            tuple(self.config.context),
+            typed_items(self.config.extra_fields),
+        )
+
+    def format_blocks(self, record: LogRecord) -> Sequence[Block]:
         level = record.levelname
-        message = record.getMessage()
+        message = self.get_message(record)
         icon = self.config.emojis.get(record.levelno)
 
         env: str | None = self.get_env(config=self.config, record=record)
@@ -177,31 +294,42 @@ class RichDesign(MessageDesign):
 
         header: HeaderBlock = self.construct_header(record=record, config=self.config, icon=icon, level=level)
         context: ContextBlock | None = self.construct_context(config=self.config, env=env, service=service)
-        body = SectionBlock(text=MarkdownTextObject(text=message))
 
-        error: SectionBlock | None = None
+        # Only append existing blocks, so there are no None values to filter out afterwards
+        blocks: list[Block] = [header]
+        if context is not None:
+            blocks.append(context)
+        blocks.append(_DIVIDER)
+        blocks.append(SectionBlock(text=MarkdownTextObject(text=message)))
+
         if record.exc_info is not None:
-            error = SectionBlock(text=MarkdownTextObject(text=f"```{record.exc_text}```"))
+            blocks.append(SectionBlock(text=MarkdownTextObject(text=f"```{record.exc_text}```")))
 
-        dynamic_extra_fields = getattr(record, "extra_fields", {})
-        all_extra_fields = {**self.config.extra_fields, **dynamic_extra_fields}
-        fields: SectionBlock | None = None
-        if all_extra_fields != {}:
-            fields = SectionBlock(
-                fields=[MarkdownTextObject(text=f"*{key}*\n{value}") for key, value in all_extra_fields.items()]
-            )
+        blocks.append(_DIVIDER)
 
-        maybe_blocks: Sequence[Block | None] = [
-            header,
-            context,
-            DividerBlock(),
-            body,
-            error,
-            DividerBlock(),
-            fields,
-        ]
+        dynamic_extra_fields = record.__dict__.get("extra_fields", _EMPTY_FIELDS)
+        if not dynamic_extra_fields:
+            if self.config.extra_fields:
+                blocks.append(self.construct_config_fields())
+        elif not self.config.extra_fields:
+            blocks.append(self.construct_fields(dynamic_extra_fields))
+        else:
+            blocks.append(self.construct_fields({**self.config.extra_fields, **dynamic_extra_fields}))
 
-        return maybe_blocks
+        return blocks
+
+    def construct_fields(self, extra_fields: Mapping[str, str]) -> SectionBlock:
+        return SectionBlock(
+            fields=[MarkdownTextObject(text=f"*{key}*\n{value}") for key, value in extra_fields.items()]
+        )
+
+    def construct_config_fields(self) -> SectionBlock:
+        items = typed_items(self.config.extra_fields)
+        if self._config_fields is not None and self._config_fields[0] == items:
+            return self._config_fields[1]
+        fields_block = self.construct_fields(self.config.extra_fields)
+        self._config_fields = (items, fields_block)
+        return fields_block
 
 
 class SlackFormatter(logging.Formatter):
@@ -225,18 +353,129 @@ class SlackFormatter(logging.Formatter):
     def default(cls, config: FormatConfig) -> "SlackFormatter":
         return cls(design=RichDesign(config), config=config)
 
+    def format_exc_text(self, record: LogRecord) -> None:
+        # Designs only need the traceback text from the stdlib formatter, which is cached on the record
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+
     def format(self, record: LogRecord) -> str:  # noqa: A003 (allow method name "format")
-        super().format(record)
+        self.format_exc_text(record)
         return self.design.format(record)
 
+    def format_blocks(self, record: LogRecord) -> Sequence[Block]:
+        # Same as format, but skips the json serialization for handlers that send the blocks directly
+        self.format_exc_text(record)
+        return self.design.build_blocks(record)
+
+
+Matcher = Callable[[str], bool]
+
+# A literal without regex syntax, optionally anchored at the start or end, or surrounded by ".*"
+_LITERAL_PATTERN_RE = re.compile(r"(?:(?P<start>\^)|(?:\.\*)?)(?P<text>[^.^$*+?{}\[\]\\|()]+)(?:(?P<end>\$)|(?:\.\*)?)")
+
+
+def compile_matcher(pattern: str) -> Matcher:
+    # Literal patterns are answered by string methods, which skip the regex engine entirely.
+    # Like re.search, "$" also matches right before a trailing newline.
+    literal = _LITERAL_PATTERN_RE.fullmatch(pattern)
+    if literal is not None:
+        text: str = literal["text"]
+        texts = (text, f"{text}\n")
+        if literal["start"] and literal["end"]:
+            return lambda haystack: haystack in texts
+        if literal["start"]:
+            return lambda haystack: haystack.startswith(text)
+        if literal["end"]:
+            return lambda haystack: haystack.endswith(texts)
+        return lambda haystack: text in haystack
+
+    search = re.compile(pattern).search
+    return lambda haystack: search(haystack) is not None
+
+
+def is_joinable(pattern: re.Pattern[str]) -> bool:
+    # Group numbers and global inline flags would change their meaning inside a joined alternation
+    return pattern.groups == 0 and pattern.flags == re.UNICODE
+
+
+_DECISION_KEYS = frozenset(("service", "environment", "context", "extra_fields"))
+
+
+def decision_key(log_filter_raw: object) -> Hashable | None:
+    # Filter decisions only depend on these values, so records with equal values can reuse a decision.
+    # Anything the strict converter would convert or reject is not cached and takes the full path.
+    if not isinstance(log_filter_raw, dict) or not log_filter_raw.keys() <= _DECISION_KEYS:
+        return None
+    service = log_filter_raw.get("service")
+    environment = log_filter_raw.get("environment")
+    context = log_filter_raw.get("context", [])
+    extra_fields = log_filter_raw.get("extra_fields", _EMPTY_FIELDS)
+    if not (
+        (service is None or type(service) is str)
+        and (environment is None or type(environment) is str)
+        and type(context) is list
+        and all(type(c) is str for c in context)
+        and isinstance(extra_fields, dict)
+        and all(type(k) is str and type(v) is str for k, v in extra_fields.items())
+    ):
+        return None
+    return (service, environment, tuple(context), frozenset(extra_fields.items()))
+
 
 class SlackFilter(logging.Filter):
     config: FilterConfig
+    _service_match: Matcher | None
+    _env_match: Matcher | None
+    _context_matches: list[Matcher]
+    _context_any_re: re.Pattern[str] | None
+    _extra_matches: dict[str, Matcher]
+    _extra_items: frozenset[tuple[str, str]]
+    _match_any: bool
+    _match: Callable[[Iterable[bool]], bool]
+    _decisions: dict[Hashable, bool]
+    _compiled_for: tuple[Any, ...]
 
     def __init__(self, config: FilterConfig | None) -> None:
         self.config = config if config is not None else FilterConfig()
+        self.compile_config()
         super().__init__()
 
+    def config_snapshot(self) -> tuple[Any, ...]:
+        config = self.config
+        return (
+            config.service,
+            config.environment,
+            tuple(config.context),
+            tuple(config.extra_fields.items()),
+            config.use_regex,
+            config.filter_type,
+        )
+
+    def refresh_config(self) -> None:
+        # The config is mutable, so changes made in place after construction are picked up here
+        if self.config_snapshot() != self._compiled_for:
+            self.compile_config()
+
+    def compile_config(self) -> None:
+        # Prepare everything that only depends on the config once instead of once per record
+        config = self.config
+        self._compiled_for = self.config_snapshot()
+        self._match = FILTER_OPS[config.filter_type]
+        self._match_any = config.filter_type in (FilterType.AnyAllowList, FilterType.AnyDenyList)
+        self._extra_items = frozenset(config.extra_fields.items())
+        use_regex = config.use_regex is True
+        self._service_match = compile_matcher(config.service) if use_regex and config.service is not None else None
+        self._env_match = compile_matcher(config.environment) if use_regex and config.environment is not None else None
+        self._context_matches = [compile_matcher(p) for p in config.context] if use_regex else []
+        self._context_any_re = None
+        if use_regex and self._match_any and len(config.context) > 1:
+            context_res = [re.compile(p) for p in config.context]
+            if all(is_joinable(p) for p in context_res):
+                # For any, a single alternation finds the first matching pattern in one search per context
+                self._context_any_re = re.compile("|".join(f"(?:{p.pattern})" for p in context_res))
+        self._extra_matches = {k: compile_matcher(v) for k, v in config.extra_fields.items()} if use_regex else {}
+        self._decisions = {}
+
     @classmethod
     def allow_by_fields(
         cls, fields: dict[str, str], filter_type: FilterType = FilterType.AnyAllowList
@@ -259,80 +498,99 @@ class SlackFilter(logging.Filter):
     ) -> "SlackFilter":
         return cls(FilterConfig(extra_fields=fields, filter_type=filter_type, use_regex=True))
 
-    def match_filter(self, cond_list: list[bool]) -> bool:
-        match self.config.filter_type:
-            case FilterType.AnyAllowList:
-                res = any(cond_list)
-            case FilterType.AllAllowList:
-                res = all(cond_list)
-            case FilterType.AnyDenyList:
-                res = not any(cond_list)
-            case FilterType.AllDenyList:
-                res = not all(cond_list)
-        log.debug("final result (%s): res(%s) = %s", self.config.filter_type, res, cond_list)
+    def match_filter(self, cond_list: Iterable[bool]) -> bool:
+        # any and all stop consuming lazy conditions as soon as the result is known
+        res = self._match(cond_list)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("final result (%s): %s", self.config.filter_type, res)
         return res
 
-    def regex_filter_config(self, service_config: LogConfig) -> bool:
-        import re
-
-        res_list = []
-        if self.config.service is not None:
-            regex = self.config.service
-            haystack = service_config.service if service_config.service is not None else ""
-            regex_match = re.search(regex, haystack)
-            res_list.append(regex_match is not None)
-        if self.config.environment is not None:
-            regex = self.config.environment
-            haystack = service_config.environment if service_config.environment is not None else ""
-            regex_match = re.search(regex, haystack)
-            res_list.append(regex_match is not None)
-        if self.config.context != []:
-            regex_list = self.config.context
-            haystack_list = service_config.context if service_config.context != [] else []
-            for haystack in haystack_list:
-                for regex in regex_list:
-                    regex_match = re.search(regex, haystack)
-                    res_list.append(regex_match is not None)
-        for field_key in self.config.extra_fields:
+    def regex_filter_conditions(self, service_config: LogConfig) -> Iterator[bool]:
+        if self._service_match is not None:
+            yield self._service_match(service_config.service if service_config.service is not None else "")
+        if self._env_match is not None:
+            yield self._env_match(service_config.environment if service_config.environment is not None else "")
+        if self._context_any_re is not None:
+            search = self._context_any_re.search
+            yield any(search(haystack) is not None for haystack in service_config.context)
+        elif self._context_matches != []:
+            yield from (match(haystack) for haystack in service_config.context for match in self._context_matches)
+        for field_key, match in self._extra_matches.items():
             filter_element = service_config.extra_fields.get(field_key)
             if filter_element is None:
-                res_list.append(False)
+                yield False
             else:
-                regex = self.config.extra_fields[field_key]
-                haystack = filter_element
-                regex_match = re.search(regex, haystack)
-                log.debug("regex filter with regex = %s, haystack = %s", regex, filter_element)
-                res_list.append(regex_match is not None)
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug(
+                        "regex filter with regex = %s, haystack = %s",
+                        self.config.extra_fields[field_key],
+                        filter_element,
+                    )
+                yield match(filter_element)
 
-        return self.match_filter(res_list)
+    def regex_filter_config(self, service_config: LogConfig) -> bool:
+        self.refresh_config()
+        return self.match_filter(self.regex_filter_conditions(service_config=service_config))
 
-    def filter_config(self, service_config: LogConfig) -> bool:
-        res_list = []
+    def filter_conditions(self, service_config: LogConfig) -> Iterator[bool]:
         if self.config.service is not None:
-            res_list.append(service_config.service == self.config.service)
+            yield service_config.service == self.config.service
         if self.config.environment is not None:
-            res_list.append(service_config.environment == self.config.environment)
+            yield service_config.environment == self.config.environment
         if self.config.context != []:
-            res_list.extend(
-                filter_context == service_context
-                for filter_context in self.config.context
-                for service_context in service_config.context
-            )
-        res_list.extend(f in service_config.extra_fields.items() for f in self.config.extra_fields.items())
+            if self._match_any:
+                # For any, one membership test per filter context gives the same result as comparing all pairs
+                service_context = set(service_config.context)
+                yield from (filter_context in service_context for filter_context in self.config.context)
+            else:
+                yield from (
+                    filter_context == service_context
+                    for filter_context in self.config.context
+                    for service_context in service_config.context
+                )
+        if self._extra_items:
+            # Any and all over one condition per field are a single set operation on the fields
+            service_fields = service_config.extra_fields.items()
+            if self._match_any:
+                yield not service_fields.isdisjoint(self._extra_items)
+            else:
+                yield service_fields >= self._extra_items
+
+    def match_config(self, service_config: LogConfig) -> bool:
+        self.refresh_config()
+        return self.match_compiled(service_config=service_config)
+
+    def match_compiled(self, service_config: LogConfig) -> bool:
+        # Matches against the compiled config as is, callers refresh it once beforehand
+        if self.config.use_regex is True:
+            return self.match_filter(self.regex_filter_conditions(service_config=service_config))
+        return self.match_filter(self.filter_conditions(service_config=service_config))
 
-        return self.match_filter(res_list)
+    def filter_config(self, service_config: LogConfig) -> bool:
+        self.refresh_config()
+        return self.match_filter(self.filter_conditions(service_config=service_config))
 
     def filter(self, record: LogRecord) -> bool:
-        log_filter_raw = getattr(record, "filter", None)
+        log_filter_raw = record.__dict__.get("filter")
         if log_filter_raw is None:
             return True
 
-        rconfig: FilterConfig = config_strict_context_converter.structure(log_filter_raw, FilterConfig)
+        self.refresh_config()
 
-        if self.config.use_regex is True:
-            return self.regex_filter_config(service_config=rconfig)
+        key = decision_key(log_filter_raw)
+        if key is not None:
+            decision = self._decisions.get(key)
+            if decision is not None:
+                return decision
+
+        rconfig: FilterConfig = config_strict_context_converter.structure(log_filter_raw, FilterConfig)
+        decision = self.match_compiled(rconfig)
 
-        return self.filter_config(service_config=rconfig)
+        if key is not None:
+            if len(self._decisions) >= DecisionCacheSize:
+                self._decisions.clear()
+            self._decisions[key] = decision
+        return decision
 
 
 @define
@@ -366,25 +624,156 @@ class DummyClient(WebhookClient):
             t = json.dumps({"text": str(text)})
 
         log.debug(t)
-        return WebhookResponse(url="", status_code=200, body="ok", headers={})
+        return WebhookResponse(url="", status_code=HTTPOk, body="ok", headers={})
+
+
+# A formatted message, either plain text or slack blocks, waiting to be sent
+QueuedMessage = tuple[LogRecord, str | Sequence[Block]]
+
+
+@functools.cache
+def default_ssl_context() -> ssl.SSLContext:
+    # Loading the CA certificates is the expensive part of the TLS setup, all webhook handlers share it
+    return ssl.create_default_context()
 
 
 class SlackHandler(logging.Handler):
     client: WebhookClient
     config: LogConfig
-
-    def __init__(self, client: WebhookClient, config: LogConfig | None) -> None:
+    batch_size: int
+    batch_interval: float
+    buffer_size: int
+    overflow_policy: OverflowPolicy
+    dropped: int
+    _queue: "queue.Queue[QueuedMessage | None] | None"
+    _worker: threading.Thread | None
+    _combined_cache: tuple[tuple[Any, ...], LogConfig] | None
+
+    def __init__(  # noqa: PLR0913 (allow many arguments here)
+        self,
+        client: WebhookClient,
+        config: LogConfig | None,
+        *,
+        background: bool = False,
+        batch_size: int = 1,
+        batch_interval: float = 0.05,
+        buffer_size: int = 0,
+        overflow_policy: OverflowPolicy = OverflowPolicy.Block,
+    ) -> None:
         self.client = client
         self.config = config if config is not None else LogConfig()
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.buffer_size = buffer_size
+        self.overflow_policy = overflow_policy
+        self.dropped = 0
+        self._queue = None
+        self._worker = None
+        self._combined_cache = None
         super().__init__()
+        if background:
+            self.start_worker()
 
     @classmethod
-    def from_webhook(cls, webhook_url: str) -> "SlackHandler":
-        return cls(client=WebhookClient(webhook_url), config=LogConfig())
+    def from_webhook(  # noqa: PLR0913 (allow many arguments here)
+        cls,
+        webhook_url: str,
+        *,
+        background: bool = False,
+        batch_size: int = 1,
+        batch_interval: float = 0.05,
+        buffer_size: int = 0,
+        overflow_policy: OverflowPolicy = OverflowPolicy.Block,
+    ) -> "SlackHandler":
+        # Without an explicit context, every request loads the CA certificates again
+        return cls(
+            client=WebhookClient(webhook_url, ssl=default_ssl_context()),
+            config=LogConfig(),
+            background=background,
+            batch_size=batch_size,
+            batch_interval=batch_interval,
+            buffer_size=buffer_size,
+            overflow_policy=overflow_policy,
+        )
 
     @classmethod
-    def dummy(cls) -> "SlackHandler":
-        return cls(client=DummyClient(), config=LogConfig())
+    def dummy(
+        cls,
+        *,
+        background: bool = False,
+        batch_size: int = 1,
+        batch_interval: float = 0.05,
+        buffer_size: int = 0,
+        overflow_policy: OverflowPolicy = OverflowPolicy.Block,
+    ) -> "SlackHandler":
+        return cls(
+            client=DummyClient(),
+            config=LogConfig(),
+            background=background,
+            batch_size=batch_size,
+            batch_interval=batch_interval,
+            buffer_size=buffer_size,
+            overflow_policy=overflow_policy,
+        )
+
+    def start_worker(self) -> None:
+        # A single long-lived thread sends the messages, so emit does not block on the webhook request.
+        if self._worker is not None:
+            return
+        self._queue = queue.Queue(maxsize=self.buffer_size)
+        self._worker = threading.Thread(target=self._run_worker, args=(self._queue,), name="slack-logger", daemon=True)
+        self._worker.start()
+
+    def _run_worker(self, message_queue: "queue.Queue[QueuedMessage | None]") -> None:
+        while True:
+            batch = self._collect_batch(message_queue)
+            try:
+                self.send_batch([item for item in batch if item is not None])
+            finally:
+                for _ in batch:
+                    message_queue.task_done()
+            if batch[-1] is None:  # stop signal from close
+                return
+
+    def _collect_batch(self, message_queue: "queue.Queue[QueuedMessage | None]") -> list[QueuedMessage | None]:
+        # Wait for one message, then coalesce whatever arrives within the batch interval
+        batch = [message_queue.get()]
+        deadline = time.monotonic() + self.batch_interval
+        while batch[-1] is not None and len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(message_queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def send_batch(self, batch: list[QueuedMessage]) -> None:
+        # Consecutive messages of the same kind are merged into a single webhook call
+        group: list[QueuedMessage] = []
+        group_blocks = 0
+        for item in batch:
+            _, message = item
+            is_text = isinstance(message, str)
+            num_blocks = 0 if is_text else len(message)
+            if group != [] and (isinstance(group[0][1], str) != is_text or group_blocks + num_blocks > SlackMaxBlocks):
+                self.send_group(group)
+                group = []
+                group_blocks = 0
+            group.append(item)
+            group_blocks += num_blocks
+        if group != []:
+            self.send_group(group)
+
+    def send_group(self, group: list[QueuedMessage]) -> None:
+        record, message = group[0]
+        if len(group) > 1:
+            if isinstance(message, str):
+                message = "\n".join(str(m) for _, m in group)
+            else:
+                message = [block for _, m in group if not isinstance(m, str) for block in m]
+        self.send_message(record=record, message=message)
 
     def send_text_via_webhook(self, text: str) -> str:
         response = self.client.send(text=text)
@@ -392,46 +781,134 @@ class SlackHandler(logging.Handler):
             raise SendError(code=response.status_code, msg=response.body)
         return str(response.body)
 
-    def send_blocks_via_webhook(self, blocks: str) -> str:
-        block_seq = Block.parse_all(json.loads(blocks))
+    def send_blocks_via_webhook(self, blocks: str | Sequence[Block]) -> str:
+        block_seq = Block.parse_all(json.loads(blocks)) if isinstance(blocks, str) else blocks
         response = self.client.send(blocks=block_seq)
         if response.status_code != HTTPOk or response.body != "ok":
             raise SendError(code=response.status_code, msg=response.body)
         return str(response.body)
 
-    def emit(self, record: LogRecord) -> None:
+    def send_message(self, record: LogRecord, message: str | Sequence[Block]) -> None:
         try:
-            formatted_message = self.format(record)
-            if isinstance(self.formatter, SlackFormatter):
-                self.send_blocks_via_webhook(blocks=formatted_message)
+            if isinstance(message, str):
+                self.send_text_via_webhook(text=message)
             else:
-                self.send_text_via_webhook(text=formatted_message)
+                self.send_blocks_via_webhook(blocks=message)
 
         except Exception:
             log.exception("Couldn't send message to webhook!")
             self.handleError(record)
 
+    def emit(self, record: LogRecord) -> None:
+        if threading.current_thread() is self._worker:
+            # Records logged while sending, like a send failure reaching a root handler, would wait for the worker itself
+            self.dropped += 1
+            return
+
+        try:
+            formatted_message: str | Sequence[Block]
+            if isinstance(self.formatter, SlackFormatter):
+                if type(self.formatter).format is SlackFormatter.format and (
+                    type(self.formatter.design).format is MessageDesign.format
+                ):
+                    # Slack formatters hand over their blocks directly to avoid a json round trip
+                    formatted_message = self.formatter.format_blocks(record)
+                else:
+                    # An overridden format decides the message, like the string branch of send_blocks_via_webhook
+                    formatted_message = Block.parse_all(json.loads(self.format(record)))
+            else:
+                formatted_message = self.format(record)
+        except Exception:
+            log.exception("Couldn't format message!")
+            self.handleError(record)
+            return
+
+        # Read once, close may reset the queue from another thread
+        message_queue = self._queue
+        if message_queue is not None:
+            self.enqueue(message_queue=message_queue, item=(record, formatted_message))
+        else:
+            self.send_message(record=record, message=formatted_message)
+
+    def enqueue(self, message_queue: "queue.Queue[QueuedMessage | None]", item: QueuedMessage) -> None:
+        # A full buffer means slack is slower than the logs come in, the overflow policy decides what to give up
+        if self.overflow_policy is OverflowPolicy.Block:
+            message_queue.put(item)
+            return
+        while True:
+            try:
+                message_queue.put_nowait(item)
+            except queue.Full:
+                if self.overflow_policy is OverflowPolicy.DropNewest:
+                    self.dropped += 1
+                    return
+            else:
+                return
+            try:
+                oldest = message_queue.get_nowait()
+            except queue.Empty:
+                continue
+            message_queue.task_done()
+            self.dropped += 1
+            if oldest is None:
+                # The stop signal from close must reach the worker, the new message is given up instead
+                message_queue.put(None)
+                return
+
+    def flush(self) -> None:
+        if self._queue is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        if self._queue is not None and self._worker is not None:
+            self._queue.put(None)
+            self._worker.join()
+            self._queue = None
+            self._worker = None
+        super().close()
+
+    def combine_config(self, format_config: FormatConfig) -> LogConfig:
+        # The configs are mutable, so the cache is keyed on their values instead of the objects
+        cache_key = (
+            self.config.service,
+            self.config.environment,
+            tuple(self.config.context),
+            tuple(self.config.extra_fields.items()),
+            format_config.service,
+            format_config.environment,
+        )
+        cache = self._combined_cache
+        if cache is not None and cache[0] == cache_key:
+            return cache[1]
+
+        # Handler values overwrite formatter values unless they are None.
+        # Context and extra fields are never None, so the handler ones always win.
+        combined_config = LogConfig(
+            service=self.config.service if self.config.service is not None else format_config.service,
+            environment=self.config.environment if self.config.environment is not None else format_config.environment,
+            context=[str(c) for c in self.config.context],
+            extra_fields=dict(self.config.extra_fields),
+        )
+        self._combined_cache = (cache_key, combined_config)
+        return combined_config
+
     def handle(self, record: LogRecord) -> bool:
-        # This pre-filters the messages with the Slack Filters
-        if isinstance(self.formatter, SlackFormatter) and self.formatter.config is not None:
-            combined_config: LogConfig = config_strict_context_converter.structure(
-                {
-                    **asdict(self.formatter.config),
-                    **{k: v for k, v in asdict(self.config).items() if v is not None},  # overwrite non None values
-                },
-                LogConfig,
-            )
-            log.debug("handler config: %s", self.config)
-            log.debug("formatter config: %s", self.formatter.config)
-            log.debug("combined config: %s", combined_config)
-            for sf in self.filters:
-                if isinstance(sf, SlackFilter):
-                    res = True
-                    if sf.config.use_regex is True:
-                        res = sf.regex_filter_config(service_config=combined_config)
-                    else:
-                        res = sf.filter_config(service_config=combined_config)
-                    if res is False:
-                        return False
+        # This pre-filters the messages with the Slack Filters.
+        # Most handlers have no filters or no configured slack formatter, so those are checked first.
+        if not self.filters or not isinstance(self.formatter, SlackFormatter) or self.formatter.config is None:
+            return super().handle(record)
+
+        slack_filters = [sf for sf in self.filters if isinstance(sf, SlackFilter)]
+        if slack_filters != []:
+            combined_config: LogConfig = self.combine_config(format_config=self.formatter.config)
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("handler config: %s", self.config)
+                log.debug("formatter config: %s", self.formatter.config)
+                log.debug("combined config: %s", combined_config)
+            # All filters have to pass, so the cheap plain comparisons get the first chance to reject the record
+            slack_filters.sort(key=lambda sf: sf.config.use_regex is True)
+            for sf in slack_filters:
+                if sf.match_config(combined_config) is False:
+                    return False
 
         return super().handle(record)
@@ -1,9 +1,23 @@
+import json
 import logging
+import queue
+import threading
 from collections.abc import Generator
+from typing import Any
 
 import pytest
-
-from slack_logger import FormatConfig, SlackFormatter, SlackHandler
+from attrs import Factory, define
+from slack_sdk.webhook import WebhookResponse
+
+from slack_logger import (
+    DummyClient,
+    FormatConfig,
+    NoDesign,
+    OverflowPolicy,
+    QueuedMessage,
+    SlackFormatter,
+    SlackHandler,
+)
 
 from .utils import DEFAULT_ADDITIONAL_FIELDS, default_msg, minimal_msg, plain_msg, text_msg
 
@@ -25,11 +39,16 @@ logger.addHandler(slack_handler)
 def cleanup(caplog) -> Generator:  # type: ignore # noqa: ANN001
     caplog.clear()
     slack_handler.setFormatter(None)
-    slack_handler.filters = []
+    slack_handler.filters.clear()
     yield slack_handler
     slack_handler.setFormatter(None)
-    slack_handler.filters = []
-    caplog.clear()
+    slack_handler.filters.clear()
+
+
+@pytest.fixture(scope="module")
+def default_formatter() -> SlackFormatter:
+    service_config = FormatConfig(service="testrunner", environment="test", extra_fields={"foo": "bar", "raven": "caw"})
+    return SlackFormatter.default(service_config)
 
 
 def test_basic_unformatted_logging(caplog) -> None:  # type: ignore # noqa: ANN001
@@ -40,9 +59,10 @@ def test_basic_unformatted_logging(caplog) -> None:  # type: ignore # noqa: ANN0
     logger.warning("unformatted warning %s", log_msg)
     logger.error("unformatted error %s", log_msg)
 
-    assert text_msg(f"unformatted info {log_msg}") not in caplog.messages
-    assert text_msg(f"unformatted warning {log_msg}") in caplog.messages
-    assert text_msg(f"unformatted error {log_msg}") in caplog.messages
+    messages = frozenset(caplog.messages)
+    assert text_msg(f"unformatted info {log_msg}") not in messages
+    assert text_msg(f"unformatted warning {log_msg}") in messages
+    assert text_msg(f"unformatted error {log_msg}") in messages
 
 
 def test_basic_plain_formatted_logging(caplog) -> None:  # type: ignore # noqa: ANN001
@@ -55,9 +75,10 @@ def test_basic_plain_formatted_logging(caplog) -> None:  # type: ignore # noqa:
     logger.warning("plain warning %s", log_msg)
     logger.error("plain error %s", log_msg)
 
-    assert plain_msg(f"plain info {log_msg}") not in caplog.messages
-    assert plain_msg(f"plain warning {log_msg}") in caplog.messages
-    assert plain_msg(f"plain error {log_msg}") in caplog.messages
+    messages = frozenset(caplog.messages)
+    assert plain_msg(f"plain info {log_msg}") not in messages
+    assert plain_msg(f"plain warning {log_msg}") in messages
+    assert plain_msg(f"plain error {log_msg}") in messages
 
 
 def test_basic_minimal_formatted_logging(caplog) -> None:  # type: ignore # noqa: ANN001
@@ -71,66 +92,82 @@ def test_basic_minimal_formatted_logging(caplog) -> None:  # type: ignore # noqa
     logger.warning("minimal warning %s", log_msg)
     logger.error("minimal error %s", log_msg)
 
-    assert minimal_msg(f"minimal info {log_msg}", levelno=logging.INFO) not in caplog.messages
-    assert minimal_msg(f"minimal warning {log_msg}", levelno=logging.WARNING) in caplog.messages
-    assert minimal_msg(f"minimal error {log_msg}", levelno=logging.ERROR) in caplog.messages
+    messages = frozenset(caplog.messages)
+    assert minimal_msg(f"minimal info {log_msg}", levelno=logging.INFO) not in messages
+    assert minimal_msg(f"minimal warning {log_msg}", levelno=logging.WARNING) in messages
+    assert minimal_msg(f"minimal error {log_msg}", levelno=logging.ERROR) in messages
 
 
-def test_basic_default_formatted_logging(caplog) -> None:  # type: ignore # noqa: ANN001
+def test_basic_default_formatted_logging(caplog, default_formatter: SlackFormatter) -> None:  # type: ignore # noqa: ANN001
     """Check if only correct level is logged when not using default SlackFormatter"""
     log_msg = "from basic_text_logging"
-    service_config = FormatConfig(service="testrunner", environment="test", extra_fields={"foo": "bar", "raven": "caw"})
-    formatter = SlackFormatter.default(service_config)
-    slack_handler.setFormatter(formatter)
+    slack_handler.setFormatter(default_formatter)
 
     logger.info("default info %s", log_msg)
     logger.warning("default warning %s", log_msg)
     logger.error("default error %s", log_msg)
 
-    assert default_msg(f"default info {log_msg}", levelno=logging.INFO) not in caplog.messages
-    assert default_msg(f"default warning {log_msg}", levelno=logging.WARNING) in caplog.messages
-    assert default_msg(f"default error {log_msg}", levelno=logging.ERROR) in caplog.messages
+    messages = frozenset(caplog.messages)
+    assert default_msg(f"default info {log_msg}", levelno=logging.INFO) not in messages
+    assert default_msg(f"default warning {log_msg}", levelno=logging.WARNING) in messages
+    assert default_msg(f"default error {log_msg}", levelno=logging.ERROR) in messages
+
+
+def test_overridden_format_logging(caplog) -> None:  # type: ignore # noqa: ANN001
+    """Check if a SlackFormatter or MessageDesign that overrides format decides the sent blocks"""
+    divider_msg = json.dumps({"blocks": [{"type": "divider"}]})
+
+    class DividerFormatter(SlackFormatter):
+        def format(self, record: logging.LogRecord) -> str:  # noqa: ARG002 (overrides format)
+            return json.dumps([{"type": "divider"}])
+
+    slack_handler.setFormatter(DividerFormatter(design=NoDesign()))
+    logger.warning("warning from overridden_formatter")
+    assert divider_msg in caplog.messages
+    assert plain_msg("warning from overridden_formatter") not in caplog.messages
+
+    class DividerDesign(NoDesign):
+        def format(self, record: logging.LogRecord) -> str:  # noqa: ARG002 (overrides format)
+            return json.dumps([{"type": "divider"}])
+
+    caplog.clear()
+    slack_handler.setFormatter(SlackFormatter(design=DividerDesign()))
+    logger.warning("warning from overridden_design")
+    assert divider_msg in caplog.messages
+    assert plain_msg("warning from overridden_design") not in caplog.messages
 
 
 # Logging with extra fields
-def test_dynamic_fields_additional(caplog) -> None:  # type: ignore # noqa: ANN001
+def test_dynamic_fields_additional(caplog, default_formatter: SlackFormatter) -> None:  # type: ignore # noqa: ANN001
     """Test if adding extra fields to when creating log messages works"""
     log_msg = "from test_dynamic_fields"
-    service_config = FormatConfig(service="testrunner", environment="test", extra_fields={"foo": "bar", "raven": "caw"})
-    formatter = SlackFormatter.default(service_config)
-    slack_handler.setFormatter(formatter)
+    slack_handler.setFormatter(default_formatter)
     logger.warning("additional %s", log_msg, extra={"extra_fields": {"cow": "moo"}})
 
-    fields_a: dict[str, dict[str, str]] = DEFAULT_ADDITIONAL_FIELDS.copy()
-    fields_a.update({"cow": {"text": "*cow*\nmoo", "type": "mrkdwn"}})
+    fields_a = {**DEFAULT_ADDITIONAL_FIELDS, "cow": {"text": "*cow*\nmoo", "type": "mrkdwn"}}
     assert (
         default_msg(f"additional {log_msg}", levelno=logging.WARNING, additional_fields_dict=fields_a)
         in caplog.messages
     )
 
 
-def test_dynamic_fields_overwrite(caplog) -> None:  # type: ignore # noqa: ANN001
+def test_dynamic_fields_overwrite(caplog, default_formatter: SlackFormatter) -> None:  # type: ignore # noqa: ANN001
     """Test if overwriting extra fields to when creating log messages works"""
     log_msg = "from test_dynamic_fields"
-    service_config = FormatConfig(service="testrunner", environment="test", extra_fields={"foo": "bar", "raven": "caw"})
-    formatter = SlackFormatter.default(service_config)
-    slack_handler.setFormatter(formatter)
+    slack_handler.setFormatter(default_formatter)
 
     logger.error("overwrite %s", log_msg, extra={"extra_fields": {"foo": "baba"}})
 
-    fields_o: dict[str, dict[str, str]] = DEFAULT_ADDITIONAL_FIELDS.copy()
-    fields_o.update({"foo": {"text": "*foo*\nbaba", "type": "mrkdwn"}})
+    fields_o = {**DEFAULT_ADDITIONAL_FIELDS, "foo": {"text": "*foo*\nbaba", "type": "mrkdwn"}}
     assert (
         default_msg(f"overwrite {log_msg}", levelno=logging.ERROR, additional_fields_dict=fields_o) in caplog.messages
     )
 
 
-def test_exception_logging(caplog) -> None:  # type: ignore # noqa: ANN001
+def test_exception_logging(caplog, default_formatter: SlackFormatter) -> None:  # type: ignore # noqa: ANN001
     """Test if the stacktrace is extracted correctly when providing exc_info to log.error"""
     log_msg = "Error!"
-    service_config = FormatConfig(service="testrunner", environment="test", extra_fields={"foo": "bar", "raven": "caw"})
-    formatter = SlackFormatter.default(service_config)
-    slack_handler.setFormatter(formatter)
+    slack_handler.setFormatter(default_formatter)
 
     def division() -> None:
         try:
@@ -144,15 +181,13 @@ def test_exception_logging(caplog) -> None:  # type: ignore # noqa: ANN001
 
     blocks_prefix = '{"blocks": [{"text": {"text": ":x: ERROR | testrunner", "type": "plain_text"}, "type": "header"}, {"elements": [{"text": ":point_right: test, testrunner", "type": "mrkdwn"}], "type": "context"}, {"type": "divider"}, {"text": {"text": "Error!", "type": "mrkdwn"}, "type": "section"}, {"text": {"text": "```Traceback (most recent call last):'
 
-    assert any(blocks_prefix in m for m in caplog.messages)
+    assert any(m.startswith(blocks_prefix) for m in caplog.messages)
 
 
-def test_auto_exception_logging(caplog) -> None:  # type: ignore # noqa: ANN001
+def test_auto_exception_logging(caplog, default_formatter: SlackFormatter) -> None:  # type: ignore # noqa: ANN001
     """Test if the stacktrace is extracted correctly when using log.exception"""
     log_msg = "Exception!"
-    service_config = FormatConfig(service="testrunner", environment="test", extra_fields={"foo": "bar", "raven": "caw"})
-    formatter = SlackFormatter.default(service_config)
-    slack_handler.setFormatter(formatter)
+    slack_handler.setFormatter(default_formatter)
 
     def division() -> None:
         try:
@@ -166,4 +201,182 @@ def test_auto_exception_logging(caplog) -> None:  # type: ignore # noqa: ANN001
 
     blocks_prefix = '{"blocks": [{"text": {"text": ":x: ERROR | testrunner", "type": "plain_text"}, "type": "header"}, {"elements": [{"text": ":point_right: test, testrunner", "type": "mrkdwn"}], "type": "context"}, {"type": "divider"}, {"text": {"text": "Exception!", "type": "mrkdwn"}, "type": "section"}, {"text": {"text": "```Traceback (most recent call last):'
 
-    assert any(blocks_prefix in m for m in caplog.messages)
+    assert any(m.startswith(blocks_prefix) for m in caplog.messages)
+
+
+def test_background_logging(caplog) -> None:  # type: ignore # noqa: ANN001
+    """Test if messages are sent from the background worker and flushed on close"""
+    log_msg = "from background_logging"
+    background_logger = logging.getLogger("BackgroundTests")
+    background_handler = SlackHandler.dummy(background=True)
+    background_handler.setLevel(logging.WARN)
+    background_logger.addHandler(background_handler)
+
+    background_logger.info("background info %s", log_msg)
+    background_logger.warning("background warning %s", log_msg)
+    background_logger.error("background error %s", log_msg)
+
+    background_logger.removeHandler(background_handler)
+    background_handler.close()
+
+    messages = frozenset(caplog.messages)
+    assert text_msg(f"background info {log_msg}") not in messages
+    assert text_msg(f"background warning {log_msg}") in messages
+    assert text_msg(f"background error {log_msg}") in messages
+
+
+def test_background_batched_logging(caplog) -> None:  # type: ignore # noqa: ANN001
+    """Test if messages arriving within the batch interval are merged into one message"""
+    log_msg = "from background_batched_logging"
+    batch_logger = logging.getLogger("BatchTests")
+    batch_handler = SlackHandler.dummy(background=True, batch_size=10, batch_interval=1.0)
+    batch_handler.setLevel(logging.WARN)
+    batch_handler.setFormatter(SlackFormatter.plain())
+    batch_logger.addHandler(batch_handler)
+
+    batch_logger.warning("first %s", log_msg)
+    batch_logger.warning("second %s", log_msg)
+
+    batch_logger.removeHandler(batch_handler)
+    batch_handler.close()
+
+    merged_blocks = [
+        {"text": {"text": f"first {log_msg}", "type": "plain_text"}, "type": "section"},
+        {"text": {"text": f"second {log_msg}", "type": "plain_text"}, "type": "section"},
+    ]
+    messages = frozenset(caplog.messages)
+    assert json.dumps({"blocks": merged_blocks}) in messages
+    assert plain_msg(f"first {log_msg}") not in messages
+
+
+def test_buffer_overflow_policy() -> None:
+    """Test which message is given up when the background buffer is full"""
+    first = logging.makeLogRecord({"msg": "first"})
+    second = logging.makeLogRecord({"msg": "second"})
+
+    drop_newest_handler = SlackHandler.dummy(buffer_size=1, overflow_policy=OverflowPolicy.DropNewest)
+    newest_queue: queue.Queue[QueuedMessage | None] = queue.Queue(maxsize=1)
+    drop_newest_handler.enqueue(message_queue=newest_queue, item=(first, "first"))
+    drop_newest_handler.enqueue(message_queue=newest_queue, item=(second, "second"))
+    assert newest_queue.get_nowait() == (first, "first")
+    assert drop_newest_handler.dropped == 1
+
+    drop_oldest_handler = SlackHandler.dummy(buffer_size=1, overflow_policy=OverflowPolicy.DropOldest)
+    oldest_queue: queue.Queue[QueuedMessage | None] = queue.Queue(maxsize=1)
+    drop_oldest_handler.enqueue(message_queue=oldest_queue, item=(first, "first"))
+    drop_oldest_handler.enqueue(message_queue=oldest_queue, item=(second, "second"))
+    assert oldest_queue.get_nowait() == (second, "second")
+    assert drop_oldest_handler.dropped == 1
+
+
+@define
+class GatedClient(DummyClient):
+    started: threading.Event = Factory(threading.Event)
+    release: threading.Event = Factory(threading.Event)
+
+    def send(self, **kwargs: Any) -> WebhookResponse:  # noqa: ANN401 (forwards all arguments)
+        self.started.set()
+        self.release.wait(timeout=5)
+        return super().send(**kwargs)
+
+
+def test_close_with_full_buffer(caplog) -> None:  # type: ignore # noqa: ANN001
+    """Test if closing stops the worker although a message arrives while the buffer is full"""
+    log_msg = "from close_with_full_buffer"
+    close_logger = logging.getLogger("CloseTests")
+    client = GatedClient()
+    close_handler = SlackHandler(
+        client=client, config=None, background=True, buffer_size=1, overflow_policy=OverflowPolicy.DropOldest
+    )
+    close_handler.setLevel(logging.WARN)
+    close_logger.addHandler(close_handler)
+    message_queue = close_handler._queue  # noqa: SLF001 (observe the buffer)
+    assert message_queue is not None
+
+    close_logger.warning("first %s", log_msg)
+    assert client.started.wait(timeout=5)
+
+    # The worker is busy, so close can only put its stop signal into the buffer and wait
+    closer = threading.Thread(target=close_handler.close, daemon=True)
+    closer.start()
+    while not message_queue.full():
+        assert closer.is_alive()
+    close_logger.warning("second %s", log_msg)
+
+    client.release.set()
+    closer.join(timeout=5)
+    close_logger.removeHandler(close_handler)
+
+    assert not closer.is_alive()
+    assert close_handler.dropped == 1
+    messages = frozenset(caplog.messages)
+    assert text_msg(f"first {log_msg}") in messages
+    assert text_msg(f"second {log_msg}") not in messages
+
+
+@define
+class FailingClient(DummyClient):
+    attempts: int = 0
+
+    def send(self, **kwargs: Any) -> WebhookResponse:  # noqa: ANN401, ARG002 (accepts all arguments)
+        self.attempts += 1
+        return WebhookResponse(url="", status_code=500, body="error", headers={})
+
+
+def test_send_failure_on_root_handler() -> None:
+    """Test if send failures logged by the worker do not block a bounded buffer of a root handler"""
+    root_logger = logging.getLogger()
+    root_handler = SlackHandler(client=FailingClient(), config=None, background=True, buffer_size=2)
+    root_handler.setLevel(logging.WARN)
+    root_logger.addHandler(root_handler)
+
+    failing_logger = logging.getLogger("FailingTests")
+    num_warnings = 5
+
+    def produce() -> None:
+        for i in range(num_warnings):
+            failing_logger.warning("warning %d from send_failure_on_root_handler", i)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        producer.join(timeout=5)
+        assert not producer.is_alive()
+        root_handler.flush()
+    finally:
+        root_logger.removeHandler(root_handler)
+
+    root_handler.close()
+    # Each failed send is reported once and that report is not sent again
+    assert root_handler.dropped == num_warnings
+
+
+def test_send_failure_not_resent() -> None:
+    """Test if a send failure logged by the worker is not queued and sent again by a root handler"""
+    root_logger = logging.getLogger()
+    client = FailingClient()
+    root_handler = SlackHandler(client=client, config=None, background=True)
+    root_handler.setLevel(logging.WARN)
+    root_logger.addHandler(root_handler)
+
+    flusher = threading.Thread(target=root_handler.flush, daemon=True)
+    try:
+        logging.getLogger("FailingTests").warning("warning from send_failure_not_resent")
+        flusher.start()
+        flusher.join(timeout=5)
+    finally:
+        root_logger.removeHandler(root_handler)
+    root_handler.close()
+
+    assert not flusher.is_alive()
+    assert client.attempts == 1
+    assert root_handler.dropped == 1
+
+
+def test_shared_ssl_context() -> None:
+    """Test if webhook handlers share one SSL context"""
+    first_handler = SlackHandler.from_webhook("https://hooks.slack.com/services/first")
+    second_handler = SlackHandler.from_webhook("https://hooks.slack.com/services/second")
+
+    assert first_handler.client.ssl is not None
+    assert first_handler.client.ssl is second_handler.client.ssl
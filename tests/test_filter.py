@@ -1,10 +1,22 @@
 import logging
+import re
+from typing import Any
 
 import pytest
+from cattrs.errors import ClassValidationError
 
-from slack_logger import FilterConfig, FilterType, FormatConfig, SlackFilter, SlackFormatter, SlackHandler
+from slack_logger import (
+    FilterConfig,
+    FilterType,
+    FormatConfig,
+    LogConfig,
+    SlackFilter,
+    SlackFormatter,
+    SlackHandler,
+    compile_matcher,
+)
 
-from .utils import default_msg, text_msg
+from .utils import default_msg, plain_msg, text_msg
 
 logger = logging.getLogger("FilterTest")
 
@@ -18,11 +30,10 @@ logger.addHandler(slack_handler)
 def cleanup(caplog) -> None:  # type: ignore # noqa: ANN001
     caplog.clear()
     slack_handler.setFormatter(None)
-    slack_handler.filters = []
+    slack_handler.filters.clear()
     yield slack_handler
     slack_handler.setFormatter(None)
-    slack_handler.filters = []
-    caplog.clear()
+    slack_handler.filters.clear()
 
 
 def test_allow_any_list_text_filter(caplog) -> None:  # type: ignore # noqa: ANN001
@@ -39,8 +50,9 @@ def test_allow_any_list_text_filter(caplog) -> None:  # type: ignore # noqa: ANN
     # Log from dev environment
     logger.warning("%s in dev and allow listed test", log_msg, extra={"filter": {"environment": "dev"}})
 
-    assert text_msg(f"{log_msg} in test and allow listed test") in caplog.messages
-    assert text_msg(f"{log_msg} in dev and allow listed test") not in caplog.messages
+    messages = frozenset(caplog.messages)
+    assert text_msg(f"{log_msg} in test and allow listed test") in messages
+    assert text_msg(f"{log_msg} in dev and allow listed test") not in messages
 
 
 def test_allow_all_list_text_filter(caplog) -> None:  # type: ignore # noqa: ANN001
@@ -71,10 +83,11 @@ def test_allow_all_list_text_filter(caplog) -> None:  # type: ignore # noqa: ANN
         extra={"filter": {"environment": "test", "extra_fields": {"cow": "muh"}}},
     )
 
-    assert text_msg(f"{log_msg} in test, allow listed test, no cow") not in caplog.messages
-    assert text_msg(f"{log_msg} in test, allow listed test, english cow") in caplog.messages
-    assert text_msg(f"{log_msg} in dev, allow listed test, english cow") not in caplog.messages
-    assert text_msg(f"{log_msg} in test, allow listed test, german cow") not in caplog.messages
+    messages = frozenset(caplog.messages)
+    assert text_msg(f"{log_msg} in test, allow listed test, no cow") not in messages
+    assert text_msg(f"{log_msg} in test, allow listed test, english cow") in messages
+    assert text_msg(f"{log_msg} in dev, allow listed test, english cow") not in messages
+    assert text_msg(f"{log_msg} in test, allow listed test, german cow") not in messages
 
 
 def test_deny_any_list_text_filter(caplog) -> None:  # type: ignore # noqa: ANN001
@@ -91,8 +104,9 @@ def test_deny_any_list_text_filter(caplog) -> None:  # type: ignore # noqa: ANN0
     # Log from dev environment
     logger.warning("%s in dev and deny listed test", log_msg, extra={"filter": {"environment": "dev"}})
 
-    assert text_msg(f"{log_msg} in test and deny listed test") not in caplog.messages
-    assert text_msg(f"{log_msg} in dev and deny listed test") in caplog.messages
+    messages = frozenset(caplog.messages)
+    assert text_msg(f"{log_msg} in test and deny listed test") not in messages
+    assert text_msg(f"{log_msg} in dev and deny listed test") in messages
 
 
 def test_deny_all_list_text_filter(caplog) -> None:  # type: ignore # noqa: ANN001
@@ -119,8 +133,9 @@ def test_deny_all_list_text_filter(caplog) -> None:  # type: ignore # noqa: ANN0
         extra={"filter": {"service": "testrunner", "extra_fields": {"foo": "muh"}}},
     )
 
-    assert text_msg(f"{log_msg} with match all deny listed test") not in caplog.messages
-    assert text_msg(f"{log_msg} without match all deny listed test") in caplog.messages
+    messages = frozenset(caplog.messages)
+    assert text_msg(f"{log_msg} with match all deny listed test") not in messages
+    assert text_msg(f"{log_msg} without match all deny listed test") in messages
 
 
 def test_allow_any_list_blocks_filter(caplog) -> None:  # type: ignore # noqa: ANN001
@@ -149,10 +164,9 @@ def test_allow_any_list_blocks_filter(caplog) -> None:  # type: ignore # noqa: A
     # Log from dev environment
     logger.warning("%s in dev and allow listed test", log_msg)
 
-    assert default_msg(log_msg=f"{log_msg} in test and allow listed test", levelno=logging.WARNING) in caplog.messages
-    assert (
-        default_msg(log_msg=f"{log_msg} in dev and allow listed test", levelno=logging.WARNING) not in caplog.messages
-    )
+    messages = frozenset(caplog.messages)
+    assert default_msg(log_msg=f"{log_msg} in test and allow listed test", levelno=logging.WARNING) in messages
+    assert default_msg(log_msg=f"{log_msg} in dev and allow listed test", levelno=logging.WARNING) not in messages
 
 
 def test_combined_list_text_filter(caplog) -> None:  # type: ignore # noqa: ANN001
@@ -223,14 +237,15 @@ def test_combined_list_text_filter(caplog) -> None:  # type: ignore # noqa: ANN0
         extra={"filter": {"context": ["rare"]}},
     )
 
-    assert text_msg(f"{log_msg} without matching field") not in caplog.messages
-    assert text_msg(f"{log_msg} with matching extra_field") in caplog.messages
-    assert text_msg(f"{log_msg} with matching allow entry and special and deny") not in caplog.messages
-    assert text_msg(f"{log_msg} with matching special in allow and deny") not in caplog.messages
-    assert text_msg(f"{log_msg} with matching extra in deny") not in caplog.messages
-    assert text_msg(f"{log_msg} with matching unique in deny and allow") not in caplog.messages
-    assert text_msg(f"{log_msg} with matching unique in deny and allow and allow extra") not in caplog.messages
-    assert text_msg(f"{log_msg} with matching rare in deny") not in caplog.messages
+    messages = frozenset(caplog.messages)
+    assert text_msg(f"{log_msg} without matching field") not in messages
+    assert text_msg(f"{log_msg} with matching extra_field") in messages
+    assert text_msg(f"{log_msg} with matching allow entry and special and deny") not in messages
+    assert text_msg(f"{log_msg} with matching special in allow and deny") not in messages
+    assert text_msg(f"{log_msg} with matching extra in deny") not in messages
+    assert text_msg(f"{log_msg} with matching unique in deny and allow") not in messages
+    assert text_msg(f"{log_msg} with matching unique in deny and allow and allow extra") not in messages
+    assert text_msg(f"{log_msg} with matching rare in deny") not in messages
 
 
 def test_allow_all_list_regex_text_filter(caplog) -> None:  # type: ignore # noqa: ANN001
@@ -263,10 +278,11 @@ def test_allow_all_list_regex_text_filter(caplog) -> None:  # type: ignore # noq
         extra={"filter": {"environment": "test", "extra_fields": {"cow": "muh"}}},
     )
 
-    assert text_msg(f"{log_msg} in test, allow listed test, no cow") not in caplog.messages
-    assert text_msg(f"{log_msg} in test, allow listed test, english cow") in caplog.messages
-    assert text_msg(f"{log_msg} in dev, allow listed test, english cow") not in caplog.messages
-    assert text_msg(f"{log_msg} in test, allow listed test, german cow") in caplog.messages
+    messages = frozenset(caplog.messages)
+    assert text_msg(f"{log_msg} in test, allow listed test, no cow") not in messages
+    assert text_msg(f"{log_msg} in test, allow listed test, english cow") in messages
+    assert text_msg(f"{log_msg} in dev, allow listed test, english cow") not in messages
+    assert text_msg(f"{log_msg} in test, allow listed test, german cow") in messages
 
 
 def test_deny_any_list_regex_context_filter(caplog) -> None:  # type: ignore # noqa: ANN001
@@ -300,6 +316,133 @@ def test_deny_any_list_regex_context_filter(caplog) -> None:  # type: ignore # n
         extra={"filter": {"environment": "prod", "context": ["foo", "job", "bar"]}},
     )
 
-    assert text_msg(f"{log_msg} in dev and allow listed prod, deny listed job context") not in caplog.messages
-    assert text_msg(f"{log_msg} in prod no job and allow listed prod, deny listed job context") in caplog.messages
-    assert text_msg(f"{log_msg} in prod in job and allow listed prod, deny listed job context") not in caplog.messages
+    messages = frozenset(caplog.messages)
+    assert text_msg(f"{log_msg} in dev and allow listed prod, deny listed job context") not in messages
+    assert text_msg(f"{log_msg} in prod no job and allow listed prod, deny listed job context") in messages
+    assert text_msg(f"{log_msg} in prod in job and allow listed prod, deny listed job context") not in messages
+
+
+def test_multiple_fields_filter() -> None:
+    """Test if any and all filter types match on one or all of several extra fields"""
+    fields = {"cow": "moo", "raven": "caw"}
+    one_field = LogConfig(extra_fields={"cow": "moo", "dog": "woof"})
+    all_fields = LogConfig(extra_fields={"cow": "moo", "raven": "caw", "dog": "woof"})
+    no_field = LogConfig(extra_fields={"cow": "muh"})
+
+    any_allow = SlackFilter.allow_by_fields(fields, filter_type=FilterType.AnyAllowList)
+    assert any_allow.filter_config(one_field) is True
+    assert any_allow.filter_config(no_field) is False
+
+    all_allow = SlackFilter.allow_by_fields(fields, filter_type=FilterType.AllAllowList)
+    assert all_allow.filter_config(one_field) is False
+    assert all_allow.filter_config(all_fields) is True
+
+    any_deny = SlackFilter.deny_by_fields(fields, filter_type=FilterType.AnyDenyList)
+    assert any_deny.filter_config(one_field) is False
+    assert any_deny.filter_config(no_field) is True
+
+    all_deny = SlackFilter.deny_by_fields(fields, filter_type=FilterType.AllDenyList)
+    assert all_deny.filter_config(one_field) is True
+    assert all_deny.filter_config(all_fields) is False
+
+
+def test_filter_decision_reuse() -> None:
+    """Test if reused filter decisions follow config changes made in place and keep rejecting invalid contexts"""
+    slack_filter = SlackFilter(config=FilterConfig(environment="test"))
+    record = logging.makeLogRecord({"filter": {"environment": "test"}})
+
+    assert slack_filter.filter(record) is True
+    assert slack_filter.filter(record) is True
+
+    slack_filter.config.environment = "prod"
+    assert slack_filter.filter(record) is False
+
+    slack_filter.config.filter_type = FilterType.AnyDenyList
+    assert slack_filter.filter(record) is True
+
+    slack_filter.config.environment = "te.*"
+    slack_filter.config.use_regex = True
+    assert slack_filter.filter(record) is False
+
+    with pytest.raises(ClassValidationError):
+        slack_filter.filter(logging.makeLogRecord({"filter": {"context": "job"}}))
+
+
+def test_filter_refreshes_once() -> None:
+    """Test if the config is checked for changes once per filter call"""
+
+    class CountingFilter(SlackFilter):
+        snapshots = 0
+
+        def config_snapshot(self) -> tuple[Any, ...]:
+            self.snapshots += 1
+            return super().config_snapshot()
+
+    for use_regex in (False, True):
+        slack_filter = CountingFilter(config=FilterConfig(environment="test", use_regex=use_regex))
+        record = logging.makeLogRecord({"filter": {"environment": "test"}})
+
+        slack_filter.snapshots = 0
+        assert slack_filter.filter(record) is True
+        assert slack_filter.snapshots == 1
+
+        slack_filter.snapshots = 0
+        assert slack_filter.match_config(LogConfig(environment="prod")) is False
+        assert slack_filter.snapshots == 1
+
+
+def test_combined_config_follows_changes(caplog) -> None:  # type: ignore # noqa: ANN001
+    """Test if handler and formatter config changes made in place reach the filters"""
+    log_msg = "warning from combined_config_follows_changes"
+
+    slack_handler.setFormatter(SlackFormatter.plain(config=FormatConfig(service="testrunner")))
+    slack_handler.addFilter(SlackFilter(config=FilterConfig(service="testrunner", filter_type=FilterType.AnyAllowList)))
+
+    logger.warning("%s with formatter service", log_msg)
+
+    slack_handler.config.service = "other"
+    logger.warning("%s with handler service", log_msg)
+
+    slack_handler.config.service = None
+    assert isinstance(slack_handler.formatter, SlackFormatter)
+    assert slack_handler.formatter.config is not None
+    slack_handler.formatter.config.service = "changed"
+    logger.warning("%s with changed formatter service", log_msg)
+
+    slack_handler.formatter.config.service = "testrunner"
+    logger.warning("%s with restored formatter service", log_msg)
+
+    messages = frozenset(caplog.messages)
+    assert plain_msg(f"{log_msg} with formatter service") in messages
+    assert plain_msg(f"{log_msg} with handler service") not in messages
+    assert plain_msg(f"{log_msg} with changed formatter service") not in messages
+    assert plain_msg(f"{log_msg} with restored formatter service") in messages
+
+
+def test_multiple_context_patterns_filter() -> None:
+    """Test if any filters match one of several context patterns, including patterns with groups"""
+    slack_filter = SlackFilter(
+        config=FilterConfig(
+            context=["^job-", r"(\w)\1x", "(?i)cron"], filter_type=FilterType.AnyAllowList, use_regex=True
+        )
+    )
+
+    assert slack_filter.regex_filter_config(LogConfig(context=["service", "job-1"])) is True
+    assert slack_filter.regex_filter_config(LogConfig(context=["aax"])) is True
+    assert slack_filter.regex_filter_config(LogConfig(context=["CRON"])) is True
+    assert slack_filter.regex_filter_config(LogConfig(context=["abx", "service"])) is False
+
+    joined_filter = SlackFilter(
+        config=FilterConfig(context=["^job-", "cron$"], filter_type=FilterType.AnyDenyList, use_regex=True)
+    )
+    assert joined_filter.regex_filter_config(LogConfig(context=["nightly-cron"])) is False
+    assert joined_filter.regex_filter_config(LogConfig(context=["service"])) is True
+
+
+@pytest.mark.parametrize(
+    "pattern", ["job", ".*job.*", "^job", "^job.*", "job$", ".*job$", "^job$", "j.b", "^.*job", "job.*$"]
+)
+@pytest.mark.parametrize("haystack", ["", "job", "job\n", "a job", "jobs", "a\njob", "job\nb", "jab"])
+def test_literal_pattern_matcher(pattern: str, haystack: str) -> None:
+    """Test if literal fast paths match exactly like a regex search"""
+    assert compile_matcher(pattern)(haystack) is (re.search(pattern, haystack) is not None)
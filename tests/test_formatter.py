@@ -1,8 +1,12 @@
 import logging
+from collections.abc import Sequence
+from typing import Any
 
 import pytest
+from slack_sdk.models.blocks import Block, ContextBlock, HeaderBlock
+from slack_sdk.models.blocks.basic_components import MarkdownTextObject, PlainTextObject
 
-from slack_logger import MessageDesign, SlackHandler
+from slack_logger import DEFAULT_EMOJIS, FormatConfig, MessageDesign, MinimalDesign, RichDesign, SlackHandler
 
 logger = logging.getLogger("FormattingTests")
 
@@ -20,3 +24,132 @@ def test_unimpl_design() -> None:
 
     with pytest.raises(TypeError):
         UnimplDesign()  # type: ignore
+
+
+def test_emojis_not_shared() -> None:
+    """Test if changing the emojis of one config leaves the defaults untouched"""
+    config = FormatConfig()
+    config.emojis[logging.WARNING] = ":bell:"
+
+    assert FormatConfig().emojis[logging.WARNING] == ":warning:"
+    assert DEFAULT_EMOJIS[logging.WARNING] == ":warning:"
+
+
+def test_header_reuse() -> None:
+    """Test if header blocks are reused for records with the same level and service"""
+    design = MinimalDesign(FormatConfig(service="testrunner"))
+
+    def header(msg: str, level: int) -> Block | None:
+        record = logger.makeRecord(logger.name, level, __file__, 0, msg, (), None)
+        return design.format_blocks(record)[0]
+
+    assert header("first", logging.WARNING) is header("second", logging.WARNING)
+    assert header("first", logging.WARNING) is not header("first", logging.ERROR)
+
+
+def test_design_without_attrs() -> None:
+    """Test if designs that are no attrs classes can use the header of MessageDesign"""
+
+    class PlainDesign(MessageDesign):
+        def __init__(self, config: FormatConfig) -> None:
+            self.config = config
+
+        def format_blocks(self, record: logging.LogRecord) -> Sequence[Block | None]:
+            icon = self.config.emojis.get(record.levelno)
+            return [self.construct_header(record=record, config=self.config, icon=icon, level=record.levelname)]
+
+    design = PlainDesign(FormatConfig(service="testrunner"))
+    record = logger.makeRecord(logger.name, logging.WARNING, __file__, 0, "plain", (), None)
+
+    assert design.format_blocks(record) == [HeaderBlock(text=PlainTextObject(text=":warning: WARNING | testrunner"))]
+    assert ":warning: WARNING | testrunner" in design.format(record)
+
+
+def test_context_without_env_and_service() -> None:
+    """Test if the context shows the known value only and is omitted when neither env nor service are known"""
+    design = RichDesign(FormatConfig())
+
+    assert design.construct_context(config=design.config, env=None, service="testrunner") == ContextBlock(
+        elements=[MarkdownTextObject(text=":point_right: testrunner")]
+    )
+    assert design.construct_context(config=design.config, env="test", service=None) == ContextBlock(
+        elements=[MarkdownTextObject(text=":point_right: test")]
+    )
+    assert design.construct_context(config=design.config, env=None, service=None) is None
+
+
+def test_blocks_reuse() -> None:
+    """Test if blocks are reused for records with the same message and fields"""
+    design = RichDesign(FormatConfig(service="testrunner", environment="test"))
+
+    def blocks(msg: str, extra_fields: dict[str, str]) -> Sequence[Block]:
+        record = logger.makeRecord(
+            logger.name, logging.WARNING, __file__, 0, msg, (), None, extra={"extra_fields": extra_fields}
+        )
+        return design.build_blocks(record)
+
+    assert blocks("repeated", {"foo": "bar"}) is blocks("repeated", {"foo": "bar"})
+    assert blocks("repeated", {"foo": "bar"}) is not blocks("repeated", {"foo": "baba"})
+    assert blocks("repeated", {"foo": "bar"}) is not blocks("other", {"foo": "bar"})
+
+
+def test_blocks_reuse_by_type() -> None:
+    """Test if equal values of different types, like 1 and True, are not served the same blocks"""
+    rich_design = RichDesign(FormatConfig(service="testrunner", environment="test"))
+    minimal_design = MinimalDesign(FormatConfig(service="testrunner"))
+
+    def blocks(design: MessageDesign, extra: dict[str, Any]) -> list[dict[str, Any]]:
+        record = logger.makeRecord(logger.name, logging.WARNING, __file__, 0, "repeated", (), None, extra=extra)
+        return [block.to_dict() for block in design.build_blocks(record)]
+
+    assert blocks(rich_design, {"extra_fields": {"a": 1}})[-1]["fields"][0]["text"] == "*a*\n1"
+    assert blocks(rich_design, {"extra_fields": {"a": True}})[-1]["fields"][0]["text"] == "*a*\nTrue"
+    assert blocks(rich_design, {"environment": 1})[1]["elements"][0]["text"] == ":point_right: 1, testrunner"
+    assert blocks(rich_design, {"environment": 1.0})[1]["elements"][0]["text"] == ":point_right: 1.0, testrunner"
+    assert blocks(minimal_design, {"service": 1})[0]["text"]["text"] == ":warning: WARNING | 1"
+    assert blocks(minimal_design, {"service": True})[0]["text"]["text"] == ":warning: WARNING | True"
+
+
+def test_blocks_follow_config_changes() -> None:
+    """Test if reused blocks are built again after the design config changed"""
+    config = FormatConfig(service="testrunner", environment="test")
+    rich_design = RichDesign(config)
+    minimal_design = MinimalDesign(config)
+
+    def blocks(design: MessageDesign) -> list[dict[str, Any]]:
+        record = logger.makeRecord(logger.name, logging.WARNING, __file__, 0, "repeated", (), None)
+        return [block.to_dict() for block in design.build_blocks(record)]
+
+    rich_blocks = blocks(rich_design)
+    minimal_blocks = blocks(minimal_design)
+
+    config.extra_fields["raven"] = "caw"
+    assert blocks(rich_design)[-1] == {"fields": [{"text": "*raven*\ncaw", "type": "mrkdwn"}], "type": "section"}
+
+    config.emojis[logging.WARNING] = ":bell:"
+    assert blocks(minimal_design)[0]["text"]["text"] == ":bell: WARNING | testrunner"
+
+    config.service = "other"
+    assert blocks(minimal_design)[0]["text"]["text"] == ":bell: WARNING | other"
+    assert blocks(rich_design) != rich_blocks
+    assert blocks(minimal_design) != minimal_blocks
+
+
+def test_config_fields_reuse() -> None:
+    """Test if the block of configured extra fields is reused until the fields change"""
+    design = RichDesign(FormatConfig(extra_fields={"foo": "bar"}))
+
+    def fields_block(msg: str) -> Block:
+        record = logger.makeRecord(logger.name, logging.WARNING, __file__, 0, msg, (), None)
+        return design.build_blocks(record)[-1]
+
+    assert fields_block("first") is fields_block("second")
+
+    design.config.extra_fields["raven"] = "caw"
+    assert fields_block("first") == design.construct_fields({"foo": "bar", "raven": "caw"})
+    assert fields_block("first") is fields_block("third")
+
+    design.config.extra_fields = {"a": 1}  # type: ignore[dict-item]
+    assert fields_block("first") == design.construct_fields({"a": "1"})
+    design.config.extra_fields = {"a": True}  # type: ignore[dict-item]
+    assert fields_block("first") == design.construct_fields({"a": "True"})
@@ -1,31 +1,41 @@
 import json
 import logging
+from collections.abc import Mapping
+from types import MappingProxyType
 
 from slack_logger import DEFAULT_EMOJIS
 
-DEFAULT_ADDITIONAL_FIELDS: dict[str, dict[str, str]] = {
-    "foo": {"text": "*foo*\nbar", "type": "mrkdwn"},
-    "raven": {"text": "*raven*\ncaw", "type": "mrkdwn"},
-}
+DEFAULT_ADDITIONAL_FIELDS: Mapping[str, dict[str, str]] = MappingProxyType(
+    {
+        "foo": {"text": "*foo*\nbar", "type": "mrkdwn"},
+        "raven": {"text": "*raven*\ncaw", "type": "mrkdwn"},
+    }
+)
+
+HEADER_TEXTS: Mapping[int, str] = MappingProxyType(
+    {levelno: f"{emoji} {logging.getLevelName(levelno)} | testrunner" for levelno, emoji in DEFAULT_EMOJIS.items()}
+)
+
+# Blocks that are the same in every expected message, json.dumps only reads them
+CONTEXT_BLOCK = {"elements": [{"text": ":point_right: test, testrunner", "type": "mrkdwn"}], "type": "context"}
+DIVIDER_BLOCK = {"type": "divider"}
 
 
 def default_msg(
-    log_msg: str, levelno: int, additional_fields_dict: dict[str, dict[str, str]] = DEFAULT_ADDITIONAL_FIELDS
+    log_msg: str, levelno: int, additional_fields_dict: Mapping[str, dict[str, str]] = DEFAULT_ADDITIONAL_FIELDS
 ) -> str:
     additional_fields: list[dict[str, str]] = list(additional_fields_dict.values())
-    emoji = DEFAULT_EMOJIS.get(levelno)
-    level_name = logging.getLevelName(levelno)
     return json.dumps(
         {
             "blocks": [
-                {"text": {"text": f"{emoji} {level_name} | testrunner", "type": "plain_text"}, "type": "header"},
-                {"elements": [{"text": ":point_right: test, testrunner", "type": "mrkdwn"}], "type": "context"},
-                {"type": "divider"},
+                {"text": {"text": HEADER_TEXTS[levelno], "type": "plain_text"}, "type": "header"},
+                CONTEXT_BLOCK,
+                DIVIDER_BLOCK,
                 {
                     "text": {"text": log_msg, "type": "mrkdwn"},
                     "type": "section",
                 },
-                {"type": "divider"},
+                DIVIDER_BLOCK,
                 {
                     "fields": additional_fields,
                     "type": "section",
@@ -36,12 +46,10 @@ def default_msg(
 
 
 def minimal_msg(log_msg: str, levelno: int) -> str:
-    emoji = DEFAULT_EMOJIS.get(levelno)
-    level_name = logging.getLevelName(levelno)
     return json.dumps(
         {
             "blocks": [
-                {"text": {"text": f"{emoji} {level_name} | testrunner", "type": "plain_text"}, "type": "header"},
+                {"text": {"text": HEADER_TEXTS[levelno], "type": "plain_text"}, "type": "header"},
                 {
                     "text": {"text": log_msg, "type": "mrkdwn"},
                     "type": "section",